@@ -1,5 +1,5 @@
 from __future__ import annotations
-import os, ftplib, traceback, getpass
+import os, traceback, getpass, hashlib
 from typing import List, Tuple, TYPE_CHECKING
 from urllib.error import HTTPError
 
@@ -15,6 +15,7 @@ from .papa_deploy import PapaFileInfo
 
 
 if TYPE_CHECKING:
+    import ftplib
     from .build_target import BuildTarget
     from .build_config import BuildConfig
 
@@ -24,6 +25,9 @@ def artifactory_archive_name(target:BuildTarget):
     Constructs archive name for papa deploy packages in the form of:
     {name}-{platform}-{compiler}-{arch}-{build_type}-{commit_hash}
     Example: opencv-linux-x64-gcc9-release-df76b66
+    If custom flags= or coverage options are given, a short hash of them is appended,
+    so that artifacts built with different compiler flags are never mixed up:
+    Example: opencv-linux-x64-gcc9-release-df76b66-3f2a91c0
     """
     p:ArtifactoryPkg = target.dep.dep_source
 
@@ -63,7 +67,17 @@ def artifactory_archive_name(target:BuildTarget):
     if target.config.sanitize:
         build_type += '-sanitized'
 
-    return f'{name}-{platform}-{os_major}-{compiler}-{arch}-{build_type}-{version}'
+    archive = f'{name}-{platform}-{os_major}-{compiler}-{arch}-{build_type}-{version}'
+    flags_hash = _build_flags_hash(target.config)
+    return f'{archive}-{flags_hash}' if flags_hash else archive
+
+
+def _build_flags_hash(config:BuildConfig):
+    """ Short content hash of the custom build flags which change the produced binaries """
+    if not config.flags and not config.coverage:
+        return '' # default builds keep their plain archive names
+    key = f'flags={config.flags or ""};coverage={config.coverage or ""}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:8]
 
 
 keyr = None
@@ -118,6 +132,7 @@ def _store_artifactory_ftp_credentials(config:BuildConfig, url, username, passwo
 
 
 def artifactory_ftp_login(ftp:ftplib.FTP_TLS, config:BuildConfig, url:str):
+    import ftplib
     connected = False
     while True:
         username, password = _get_artifactory_ftp_credentials(config, url)
@@ -178,6 +193,7 @@ def artifactory_upload_ftp(target:BuildTarget, file_path:str) -> bool:
     if not url: raise RuntimeError(f'Artifactory Upload failed: artifactory_ftp not set by config.set_artifactory_ftp()')
     if config.verbose: console(f'  - Artifactory Upload {file_path}\n {"":12}-> {url}')
 
+    import ftplib # lazy, because it pulls in ssl, which only uploads need
     with ftplib.FTP_TLS() as ftp:
         try:
             # sanitize url for ftplib
@@ -1,4 +1,4 @@
-import os, sys, tempfile, platform, psutil, shutil
+import os, sys, platform, shutil
 from typing import List
 from mama.platforms.oclea import Oclea
 from mama.platforms.mips import Mips
@@ -54,6 +54,7 @@ class BuildConfig:
         self.raspi   = False
         self.oclea : Oclea = None
         self.mips : Mips = None
+        self.platform = '' ## name of the active platform: 'windows', 'linux', ..., 'mips'
         # compilers
         self.clang = True # prefer clang on linux
         self.gcc   = False
@@ -73,7 +74,8 @@ class BuildConfig:
         # valid architectures: x86, x64, arm, arm64
         self.arch    = None
         self.distro  = None  # distro information (name, major, minor)
-        self.jobs    = psutil.cpu_count()
+        self.jobs    = os.cpu_count() # same logical cpu count as psutil, without importing it
+        self.build_jobs = 0 # jobs for each single build, parallel_build splits `jobs` between builds
         self.target  = None
         self.flags   = None
         self.open    = None
@@ -86,6 +88,8 @@ class BuildConfig:
         self.artifactory_auth = None
         ## Ninja
         self.ninja_path = self.find_ninja_build()
+        ## ccache or sccache, used as the compiler launcher to skip unchanged translation units
+        self.compiler_launcher = self.find_compiler_launcher()
         ## MSVC, MSBuild
         self._visualstudio_path = None
         self._visualstudio_cmake_id = None
@@ -99,6 +103,7 @@ class BuildConfig:
         self.convenient_install = []
         ## Workspace and parsing
         self.parallel_load = False  ## Whether to load dependencies in parallel?
+        self.parallel_build = False ## Whether to build independent dependencies in parallel?
         self.global_workspace = False
         if System.windows:
             self.workspaces_root = util.normalized_path(os.getenv('HOMEPATH'))
@@ -137,6 +142,8 @@ class BuildConfig:
             elif arg == 'silent':    self.print = False
             elif arg == 'verbose':   self.verbose = True
             elif arg == 'parallel':  self.parallel_load = True
+            elif arg == 'parallel_build': self.parallel_build = True
+            elif arg == 'noccache':  self.compiler_launcher = ''
             elif arg == 'all':       self.target = 'all'
             elif arg == 'test':      self.test = ' ' # no test arguments
             elif arg == 'start':     self.start = ' ' # no start arguments
@@ -251,6 +258,8 @@ class BuildConfig:
         self.raspi   = get_new_value(self.raspi,   platforms[5])
         self.oclea   = get_new_value(self.oclea,   platforms[6], Oclea)
         self.mips    = get_new_value(self.mips,    platforms[7], Mips)
+        names = ('windows', 'linux', 'macos', 'ios', 'android', 'raspi', 'oclea', 'mips')
+        self.platform = next((name for name, on in zip(names, platforms) if on), self.platform)
         return True
 
 
@@ -338,20 +347,18 @@ class BuildConfig:
         self.arch = arch
 
 
+    def get_build_jobs(self):
+        """ Number of parallel compile jobs for a single dependency build """
+        return self.build_jobs or self.jobs
+
+
     def is_64bit_build(self):
         return (self.arch == 'x64' or self.arch == 'arm64')
 
 
     def name(self):
-        if self.windows: return 'windows'
-        if self.linux:   return 'linux'
-        if self.macos:   return 'macos'
-        if self.ios:     return 'ios'
-        if self.android: return 'android'
-        if self.raspi:   return 'raspi'
-        if self.oclea:   return 'oclea'
-        if self.mips:    return self.mips.name
-        return 'build'
+        if self.mips: return self.mips.name
+        return self.platform or 'build'
 
 
     ## These are the hard references to all build directory variations
@@ -461,11 +468,16 @@ class BuildConfig:
         if suggested_path: roots.append(suggested_path)
         roots += ['/etc/alternatives/', '/usr/bin/', '/usr/local/bin/', '/bin/']
         candidates = []
+        versions = dict() # /bin, /usr/bin and /etc/alternatives often link to the same compiler
         for root in roots:
             for suffix in suffixes:
                 cc_path = root + compiler + suffix
                 if os.path.exists(cc_path):
-                    version = self.get_gcc_clang_fullversion(cc_path, dumpfullversion) # eg 9.4.0
+                    real_path = os.path.realpath(cc_path)
+                    version = versions.get(real_path)
+                    if version is None:
+                        version = self.get_gcc_clang_fullversion(cc_path, dumpfullversion) # eg 9.4.0
+                        versions[real_path] = version
                     if self.verbose: console(f'Compiler {cc_path} version: {version}')
                     candidates.append((root, suffix, version))
         if not candidates:
@@ -580,6 +592,15 @@ class BuildConfig:
         return ''
 
 
+    def find_compiler_launcher(self):
+        for launcher in ('sccache', 'ccache'):
+            launcher_exe = util.find_executable_from_system(launcher)
+            if launcher_exe:
+                if self.verbose: console(f'Found Compiler Launcher: {launcher_exe}')
+                return launcher_exe
+        return ''
+
+
     def add_sanitizer_option(self, option):
         if self.sanitize: self.sanitize += ',' + option
         else:             self.sanitize = option
@@ -686,7 +707,7 @@ Define env RASPI_HOME with path to Raspberry tools.''')
         
         paths = []
         vs_variants = [ 'Enterprise', 'Professional', 'Community'  ]
-        for version in [ '2022' ]: # new 64-bit VS
+        for version in [ '18', '2022' ]: # new 64-bit VS
             for variant in vs_variants:
                 paths.append(f'C:\\Program Files\\Microsoft Visual Studio\\{version}\\{variant}')
         for version in [ '2019', '2017' ]:
@@ -727,10 +748,12 @@ Define env RASPI_HOME with path to Raspberry tools.''')
         if self._visualstudio_cmake_id:
             return self._visualstudio_cmake_id
         
-        path = self.get_visualstudio_path()
-        if '\\2022\\' in path: self._visualstudio_cmake_id = 'Visual Studio 17 2022'
+        # vswhere -latest picks the newest install; map its folder to the matching generator
+        path = self.get_visualstudio_path() or ''
+        if   '\\18\\' in path:   self._visualstudio_cmake_id = 'Visual Studio 18 2026'
+        elif '\\2022\\' in path: self._visualstudio_cmake_id = 'Visual Studio 17 2022'
         elif '\\2019\\' in path: self._visualstudio_cmake_id = 'Visual Studio 16 2019'
-        else:                  self._visualstudio_cmake_id = 'Visual Studio 15 2017'
+        else:                    self._visualstudio_cmake_id = 'Visual Studio 15 2017'
         
         if self.verbose: console(f'Detected CMake Generator: -G"{self._visualstudio_cmake_id}" -A {self.get_visualstudio_cmake_arch()}')
         return self._visualstudio_cmake_id
@@ -826,6 +849,7 @@ Define env RASPI_HOME with path to Raspberry tools.''')
         clang_major = '11'
         clang_ver = '11.0'
         clangpp = f'clang++{clang_major}'
+        import tempfile
         clang_zip = util.download_file(f'http://ateh10.net/dev/{clangpp}-{suffix}.zip', tempfile.gettempdir())
         console(f'Installing to /usr/local/{clangpp}')
         execute(f'sudo rm -rf /usr/local/{clangpp}') # get rid of any old stuff
@@ -871,6 +895,7 @@ Define env RASPI_HOME with path to Raspberry tools.''')
             ndk_dest = f'/opt/android-sdk/ndk'
 
         console(f'Downloading NDK {ndk_version}')
+        import tempfile
         ndk_zip = util.download_file(ndk_url, tempfile.gettempdir())
 
         if System.windows:
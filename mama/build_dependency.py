@@ -1,6 +1,6 @@
 from __future__ import annotations
-from typing import List, TYPE_CHECKING
-import os, sys, shutil, time
+from typing import Dict, List, TYPE_CHECKING
+import os, sys, shutil, time, threading
 
 from .types.dep_source import DepSource
 from .types.git import Git
@@ -34,11 +34,13 @@ class BuildDependency:
         self.nothing_to_build = False
         self.already_loaded = False
         self.already_executed = False
+        self.execute_lock = threading.Lock() # guards already_executed during parallel_build
         self.currently_loading = False
         self.from_artifactory = False # if true, this Dependency was loaded from Artifactory
         self.did_check_artifactory = False # if true, artifactory was already checked and can be skipped
         self.is_root = parent is None # Root deps are always built
         self.children: List[BuildDependency] = []
+        self.children_by_name: Dict[str, BuildDependency] = {} # same as children, for fast lookup
         self.product_sources = []
         self.flattened_deps: List[BuildDependency] = [] # flat dependencies only, nothing else
 
@@ -124,11 +126,12 @@ class BuildDependency:
             if self.config.verbose:
                 console(f'  - Target {self.name: <16} ADD {dep}', color=Color.BLUE)
 
-        if dep in self.children:
+        if self.children_by_name.get(dep.name) is dep:
             raise RuntimeError(f"BuildTarget {self.name} add dependency '{dep.name}'"\
                                 " failed because it has already been added")
 
         self.children.append(dep)
+        self.children_by_name[dep.name] = dep
         return dep
 
 
@@ -423,6 +426,7 @@ class BuildDependency:
 
 
     def successful_build(self):
+        package.clear_glob_cache() # build outputs have changed
         self.update_mamafile_tag()
         self.update_cmakelists_tag()
         self.save_dependency_list()
@@ -615,6 +619,7 @@ class BuildDependency:
 
         self.target.clean() # Customization point
         shutil.rmtree(self.build_dir, ignore_errors=True)
+        package.clear_glob_cache()
 
 
     def dirty(self):
@@ -73,9 +73,12 @@ class BuildTarget:
         self.cmake_ldflags    = dict()
         self.cmake_build_type = 'Debug' if config.debug else 'RelWithDebInfo'
         self.cmake_lists_path = 'CMakeLists.txt' # can be relative to src_dir (default), or absolute
+        self._default_options_cache = None # (signature, options) memoized by cmake_configure
+        self._configure_args_cache = None # (cmd, argv) memoized by cmake_configure
         self.enable_exceptions = True
         self.enable_unix_make  = False
         self.enable_ninja_build = True and config.ninja_path # attempt to use Ninja
+        self.enable_compiler_launcher = True # use ccache/sccache if it was found
         self.enable_fortran_build = False
         self.enable_cxx_build = True
         self.enable_multiprocess_build = True
@@ -258,9 +261,9 @@ class BuildTarget:
         """
         if self.dep.name == name:
             return self.dep
-        for dep in self.children():
-            if dep.name == name:
-                return dep
+        dep = self.dep.children_by_name.get(name)
+        if dep:
+            return dep
         raise KeyError(f"BuildTarget {self.name} has no child dependency named '{name}'")
 
 
@@ -714,12 +717,8 @@ class BuildTarget:
 
 
     def select(self, windows, linux, macos, ios, android):
-        if   self.windows and windows: return windows
-        elif self.linux   and linux:   return linux
-        elif self.macos   and macos:   return macos
-        elif self.ios     and ios:     return ios
-        elif self.android and android: return android
-        return None
+        choices = { 'windows': windows, 'linux': linux, 'macos': macos, 'ios': ios, 'android': android }
+        return choices.get(self.config.platform) or None
 
 
     def prefer_gcc(self):
@@ -863,7 +862,8 @@ class BuildTarget:
             # --> None    on failure
         ```
         """
-        return util.download_and_unzip(remote_zip, extract_dir, unless_file_exists)
+        return util.download_and_unzip(remote_zip, extract_dir, unless_file_exists,
+                                       max_workers=self.config.jobs)
 
 
     def visibility_hidden(self, hidden=True):
@@ -879,7 +879,8 @@ class BuildTarget:
     def disable_ninja_build(self):
         """
         Use this to completely disable Ninja build for this target
-        By default, if Ninja build is detected, non-MSVC builds use Ninja for faster builds.
+        By default, if Ninja build is detected, all builds use Ninja for faster builds.
+        On Windows, Ninja Multi-Config is only used from a VS Developer prompt matching the target arch.
         Use this if you want to, for example, generate Xcode project:
         ```
             if self.ios or self.macos:
@@ -889,6 +890,20 @@ class BuildTarget:
         self.enable_ninja_build = False
 
 
+    def disable_compiler_cache(self):
+        """
+        Disables ccache/sccache compiler launcher for this target.
+        By default, if ccache or sccache is found, it's used as CMAKE_<LANG>_COMPILER_LAUNCHER,
+        so unchanged sources are not recompiled after a clean or reconfigure.
+        An existing CMakeCache.txt keeps the launcher until the target is rebuilt.
+        ```
+            def configure(self):
+                self.disable_compiler_cache()
+        ```
+        """
+        self.enable_compiler_launcher = False
+
+
     def enable_fortran(self, path=''):
         """
         Enable fortran for this target only
@@ -1347,10 +1362,11 @@ class BuildTarget:
 
     ## Build only this target
     def _execute_tasks(self):
-        if self.dep.already_executed:
-            return
-        try:
+        with self.dep.execute_lock:
+            if self.dep.already_executed:
+                return
             self.dep.already_executed = True
+        try:
             self._execute_build_tasks()
             self._execute_deploy_tasks()
             self._execute_run_tasks()
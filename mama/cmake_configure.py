@@ -1,15 +1,20 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING
-import os
-from .utils.system import System, console, Color
-from .utils.sub_process import SubProcess, execute_piped_echo
+import os, re, shlex, hashlib, functools, subprocess
+from .utils.system import System, console, Color, update_environ
+from .util import has_contents_changed, write_text_to, file_content_hash
+from .utils.sub_process import SubProcess, EchoBuffer, execute_piped, execute_piped_echo
 
 if TYPE_CHECKING:
     from .build_target import BuildTarget
     from .build_config import BuildConfig
 
 
-def _rerunnable_cmake_conf(cmd, cwd, allow_rerun, target:BuildTarget, delete_cmakecache:bool = False):
+# CMakeCache.txt was generated for another source dir or generator, rerun without it
+_STALE_CMAKECACHE_ERROR = re.compile(r'CMake Error: (?:The source|Error: generator :)')
+
+
+def _rerunnable_cmake_conf(cmd, args, cwd, allow_rerun, target:BuildTarget, delete_cmakecache:bool = False):
     rerun = False
     error = ''
     if target.config.verbose: console(cmd)
@@ -19,54 +24,128 @@ def _rerunnable_cmake_conf(cmd, cwd, allow_rerun, target:BuildTarget, delete_cma
         if target.config.print: console('Deleting CMakeCache.txt')
         os.remove(target.build_dir('CMakeCache.txt'))
 
-    def handle_output(p:SubProcess, line:str):
+    def check_line(line:str):
         nonlocal rerun, delete_cmakecache
-        print(line) # newline is not included
-        if line.startswith('CMake Error: The source'):
+        if _STALE_CMAKECACHE_ERROR.match(line):
             rerun = True
             delete_cmakecache = True
         elif System.windows:
             # this happens every time MSVC compiler is updated. simple fix is to rerun cmake
             rerun |= line.startswith('  is not a full path to an existing compiler tool.')
-        elif line.startswith('CMake Error: Error: generator :') or \
-             line.startswith('CMake Error: The source'):
-            rerun = True
-            delete_cmakecache = True
 
     # run CMake configure and handle output
-    exit_status = SubProcess.run(cmd, cwd, io_func=handle_output)
+    if target.config.print:
+        echo_buffer = EchoBuffer()
+        def handle_output(p:SubProcess, line:str):
+            echo_buffer.echo(line) # newline is not included
+            check_line(line)
+        exit_status = SubProcess.run(args, cwd, io_func=handle_output, echo_buffer=echo_buffer)
+    else:
+        # nobody follows the output in silent mode, so let subprocess collect it
+        # without a pty and per-line callbacks, and only show it if configure failed
+        cp = subprocess.run(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            encoding='utf-8', errors='replace')
+        exit_status = cp.returncode
+        for line in cp.stdout.splitlines():
+            check_line(line)
+        if exit_status != 0 and not rerun:
+            console(cp.stdout, end='')
 
     if rerun and allow_rerun:
         if target.config.print: console('Rerunning CMake configure')
-        return _rerunnable_cmake_conf(cmd, cwd, False, target, delete_cmakecache=delete_cmakecache)
+        return _rerunnable_cmake_conf(cmd, args, cwd, False, target, delete_cmakecache=delete_cmakecache)
     if exit_status != 0:
         raise Exception(f'CMake configure error: {error}')
     target.dep.save_enabled_sanitizers()
     target.dep.save_enabled_coverage()
 
 
-def run_config(target:BuildTarget):
-    if not target.config.update and os.path.exists(target.build_dir('CMakeCache.txt')):
-        if target.config.verbose:
-            console('Not running CMake configure because CMakeCache.txt exists and `update` was not specified')
-        return
+def _file_content_tag(path:str):
+    try:
+        return f'{path} {file_content_hash(path)}'
+    except OSError:
+        return f'{path} missing'
 
-    def get_flags():
-        flags = ''
-        options = target.cmake_opts + _default_options(target) + target.get_product_defines()
-        for opt in options: flags += '-D'+opt+' '
-        return flags
 
+# env vars injected by `inject_env` which toolchain files read during configure
+_CONFIGURE_ENV = ('ANDROID_HOME', 'ANDROID_NDK', 'ANDROID_ABI', 'ANDROID_STL',
+                  'ANDROID_NATIVE_API_LEVEL', 'ANDROID_TOOLCHAIN',
+                  'IPHONEOS_DEPLOYMENT_TARGET', 'MACOSX_DEPLOYMENT_TARGET')
+
+
+def _configure_tag(cmd:str, options:list, cmakelists:str):
+    """ Fingerprint of the CMake configure command, its env, CMakeLists.txt and any toolchain files it references """
+    tag = [cmd, _file_content_tag(cmakelists)]
+    tag += [f'{k}={os.environ[k]}' for k in _CONFIGURE_ENV if k in os.environ]
+    for opt in options:
+        if opt.startswith('CMAKE_TOOLCHAIN_FILE='):
+            toolchain = opt[len('CMAKE_TOOLCHAIN_FILE='):].strip('"')
+            if os.path.exists(toolchain):
+                tag.append(_file_content_tag(toolchain))
+    return hashlib.blake2b('\n'.join(tag).encode('utf-8'), digest_size=20).hexdigest()
+
+
+def _unique_options(options:list):
+    """
+    Drops repeated -D options, keeping the last one of each variable, since that's the one CMake would use.
+    Variable name is the part before `=` and the optional `:TYPE`
+    """
+    seen = set()
+    unique = []
+    for opt in reversed(options):
+        name = opt.split('=', 1)[0].split(':', 1)[0].strip()
+        if name not in seen:
+            seen.add(name)
+            unique.append(opt)
+    unique.reverse()
+    return unique
+
+
+def run_config(target:BuildTarget):
+    options = _unique_options(target.cmake_opts + _default_options(target) + target.get_product_defines())
     type_flags = f'-DCMAKE_BUILD_TYPE={target.cmake_build_type}'
-    cmake_flags = get_flags()
+    cmake_flags = ' '.join('-D'+opt for opt in options)
     generator = _generator(target)
-    src_dir = os.path.dirname(target.dep.cmakelists_path())
+    cmakelists = target.dep.cmakelists_path()
+    src_dir = os.path.dirname(cmakelists)
     src_dir = src_dir if src_dir else target.source_dir()
     install_prefix = '-DCMAKE_INSTALL_PREFIX="."'
     # # use install prefix override for libraries, but for root target, leave it open-ended
     # install_prefix = '' if target.dep.is_root else '-DCMAKE_INSTALL_PREFIX="."'
     cmd = f'cmake {generator} {type_flags} {cmake_flags} {install_prefix} "{src_dir}"'
-    _rerunnable_cmake_conf(cmd, target.build_dir(), True, target)
+
+    # configure only needs to run when our own command line, CMakeLists.txt or toolchain has changed
+    tag_file = target.build_dir('mama_configure_tag')
+    new_tag = _configure_tag(cmd, options, cmakelists)
+    if os.path.exists(target.build_dir('CMakeCache.txt')):
+        if not has_contents_changed(tag_file, new_tag):
+            if target.config.verbose:
+                console('Not running CMake configure because CMakeCache.txt exists and configuration is unchanged')
+            return
+        if not target.config.update and not os.path.exists(tag_file):
+            if target.config.verbose:
+                console('Not running CMake configure because CMakeCache.txt exists and `update` was not specified')
+            return
+
+    _rerunnable_cmake_conf(cmd, _configure_args(target, cmd, generator, type_flags, options, src_dir),
+                           target.build_dir(), True, target)
+    write_text_to(tag_file, new_tag)
+
+
+def _configure_args(target:BuildTarget, cmd, generator, type_flags, options, src_dir):
+    """
+    The argv is built directly, so SubProcess doesn't need to re-tokenize the whole command line.
+    It is memoized by the formatted `cmd`, which is all the argv is derived from.
+    """
+    cached = target._configure_args_cache
+    if cached and cached[0] == cmd:
+        return cached[1]
+    args = ['cmake', *shlex.split(generator), type_flags]
+    for opt in options:
+        args += shlex.split('-D'+opt)
+    args += ['-DCMAKE_INSTALL_PREFIX=.', src_dir]
+    target._configure_args_cache = (cmd, args)
+    return args
 
 
 def is_rerunnable_error(output:str):
@@ -77,12 +156,22 @@ def is_rerunnable_error(output:str):
 
 def run_build(target:BuildTarget, install:bool, extraflags='', rerun=True):
     build_dir = target.build_dir()
-    flags = _build_config(target, install)
-    extraflags = _buildsys_flags(target)
-    cmd = f'cmake --build {build_dir} {flags} {extraflags}'
+    run_install = install and target.install_target
+    # custom install targets can only be run through cmake --build
+    if (not run_install or target.install_target == 'install') and _is_ninja_build_up_to_date(target):
+        if not run_install:
+            if target.config.verbose:
+                console('Not running cmake --build because ninja has no work to do')
+            return
+        # nothing to compile, but installed files can still be stale if the build dir
+        # was rebuilt outside of mama, so always run the install script
+        args = ['cmake', '--install', build_dir, '--config', target.cmake_build_type]
+    else:
+        args = ['cmake', '--build', build_dir] + _build_config(target, install) + _buildsys_flags(target)
+    cmd = ' '.join(args)
     if target.config.verbose:
         console(cmd, color=Color.GREEN)
-    status, output = execute_piped_echo(build_dir, cmd, echo=True)
+    status, output = execute_piped_echo(build_dir, args, echo=True)
     if status != 0:
         if rerun and is_rerunnable_error(output):
             if target.config.verbose:
@@ -96,26 +185,74 @@ def run_build(target:BuildTarget, install:bool, extraflags='', rerun=True):
             raise Exception(f'{cmd} failed with return code {status}')
 
 
+def _is_ninja_build_up_to_date(target:BuildTarget):
+    """
+    A no-op `cmake --build` still launches cmake and ninja, which re-checks the whole
+    build graph, while a ninja dry-run only needs to stat the build inputs
+    """
+    if not _is_ninja_build(target) or target.config.windows: # Ninja Multi-Config uses per-config files
+        return False
+    output = execute_piped([target.config.ninja_path, '-n', '-C', target.build_dir()], throw=False)
+    return bool(output) and output.endswith('ninja: no work to do.')
+
+
+def _msvc_dev_env_matches(config:BuildConfig):
+    """ Ninja on Windows needs a VS Developer environment (vcvars) for the target arch """
+    return _msvc_dev_env_matches_arch(config.get_visualstudio_cmake_arch().lower())
+
+
+@functools.lru_cache(maxsize=None)
+def _msvc_dev_env_matches_arch(vs_arch:str):
+    # the VS Developer environment is inherited from the parent shell and never changes during a run
+    tgt_arch = os.getenv('VSCMD_ARG_TGT_ARCH')
+    if not tgt_arch:
+        return False
+    return tgt_arch.lower() == ('x86' if vs_arch == 'win32' else vs_arch)
+
+
+def _is_ninja_build(target:BuildTarget):
+    """ Ninja is the default generator on all platforms where it was found """
+    config:BuildConfig = target.config
+    if target.enable_unix_make or not target.enable_ninja_build:
+        return False
+    if config.windows:
+        return _msvc_dev_env_matches(config)
+    return True
+
+
+_PLATFORM_GENERATORS = {
+    'android': '-G "Unix Makefiles"',
+    'linux':   '-G "Unix Makefiles"',
+    'raspi':   '-G "Unix Makefiles"',
+    'oclea':   '-G "Unix Makefiles"',
+    'mips':    '-G "Unix Makefiles"',
+    'ios':     '-G "Xcode"',
+    'macos':   '-G "Xcode"',
+}
+
+
+# (platform, arch, unix_make, ninja) -> generator, shared by all targets
+_generator_cache = {}
+
+
 def _generator(target:BuildTarget):
     config:BuildConfig = target.config
-    if target.enable_unix_make:   return '-G "Unix Makefiles"'
-    if config.windows:            return f'-G "{config.get_visualstudio_cmake_id()}" -A {config.get_visualstudio_cmake_arch()}'
-    if target.enable_ninja_build: return '-G "Ninja"'
-    if config.android:            return '-G "Unix Makefiles"'
-    if config.linux:              return '-G "Unix Makefiles"'
-    if config.raspi:              return '-G "Unix Makefiles"'
-    if config.oclea:              return '-G "Unix Makefiles"'
-    if config.mips:               return '-G "Unix Makefiles"'
-    if config.ios:                return '-G "Xcode"'
-    if config.macos:              return '-G "Xcode"'
-    else:                         return ''
+    key = (config.platform, config.arch, target.enable_unix_make, _is_ninja_build(target))
+    generator = _generator_cache.get(key)
+    if generator is None:
+        generator = _generator_cache[key] = _select_generator(config, *key[2:])
+    return generator
+
+
+def _select_generator(config:BuildConfig, unix_make:bool, ninja:bool):
+    if unix_make:      return '-G "Unix Makefiles"'
+    if ninja:          return '-G "Ninja Multi-Config"' if config.windows else '-G "Ninja"'
+    if config.windows: return f'-G "{config.get_visualstudio_cmake_id()}" -A {config.get_visualstudio_cmake_arch()}'
+    return _PLATFORM_GENERATORS.get(config.platform, '')
 
 
 def _make_program(target:BuildTarget):
-    config:BuildConfig = target.config
-    if config.windows: return ''
-    if target.enable_unix_make: return ''
-    if target.enable_ninja_build: return config.ninja_path
+    if _is_ninja_build(target): return target.config.ninja_path
     return ''
 
 
@@ -129,7 +266,97 @@ def _custom_compilers(target:BuildTarget):
     return compilers
 
 
+def _options_signature(target:BuildTarget):
+    """ Everything that _make_default_options() output depends on """
+    config:BuildConfig = target.config
+    return (config.name(), config.arch, config.clang, config.gcc,
+            config.cc_path, config.cxx_path, config.fortran, config.flags,
+            config.sanitize, config.coverage, config.with_tests, config.test, config.target,
+            config.ios_version, config.ninja_path, config.compiler_launcher,
+            target.enable_exceptions, target.enable_unix_make, target.enable_ninja_build,
+            _use_compiler_launcher(target),
+            target.enable_fortran_build, target.enable_cxx_build, target.gcc_clang_visibility_hidden,
+            target.cmake_ndk_toolchain, target.cmake_raspi_toolchain, target.cmake_ios_toolchain,
+            tuple(target.cmake_cxxflags.items()), tuple(target.cmake_ldflags.items()),
+            config.raspi_system, tuple(config.raspi_include_paths), _platform_state(config),
+            bool(config.test) and config.target_matches(target.name),
+            # relative toolchain files are resolved against the target's source dir
+            target.source_dir() if (target.cmake_ndk_toolchain or target.cmake_raspi_toolchain
+                                    or target.cmake_ios_toolchain) else '')
+
+
+def _use_compiler_launcher(target:BuildTarget):
+    """ ccache/sccache is used unless disabled, or the mamafile already sets its own launcher """
+    config:BuildConfig = target.config
+    # MSVC builds are excluded, since ccache doesn't handle MSBuild or /Zi PDB output
+    return bool(config.compiler_launcher and target.enable_compiler_launcher and not config.windows
+                and not any('_COMPILER_LAUNCHER' in opt for opt in target.cmake_opts))
+
+
+def _hashable(value):
+    if isinstance(value, dict): return tuple((k, _hashable(v)) for k, v in value.items())
+    if isinstance(value, (set, frozenset)): return tuple(sorted(_hashable(v) for v in value))
+    if isinstance(value, (list, tuple)): return tuple(_hashable(v) for v in value)
+    return value
+
+
+def _platform_state(config:BuildConfig):
+    """
+    Settings of the Android/Oclea/MIPS platform object, eg NDK path, API level or STL.
+    Private `_` attributes are internal caches (eg the injected env), not settings
+    """
+    platform = config.android or config.oclea or config.mips
+    if not platform:
+        return ()
+    return tuple((k, _hashable(v)) for k, v in vars(platform).items()
+                 if k != 'config' and not k.startswith('_'))
+
+
+# signature -> (options, cxxflags, ldflags), shared by all targets with identical settings
+_shared_default_options = {}
+
+
 def _default_options(target:BuildTarget):
+    """ Memoized _make_default_options(), recalculated only if the target or config changed """
+    signature = _options_signature(target)
+    cached = target._default_options_cache
+    if cached and cached[0] == signature:
+        return cached[1]
+    shared = _shared_default_options.get(signature)
+    if shared:
+        opt, cxxflags, ldflags = shared
+        # same default flags that _make_default_options() would have added
+        target.cmake_cxxflags.update(cxxflags)
+        target.cmake_ldflags.update(ldflags)
+    else:
+        opt = _make_default_options(target)
+        _shared_default_options[signature] = (opt, dict(target.cmake_cxxflags), dict(target.cmake_ldflags))
+    # signature is taken after the build, because default flags are added into cxxflags
+    target._default_options_cache = (_options_signature(target), opt)
+    return opt
+
+
+_RASPI_OPTIONS = (
+    'RASPI=TRUE',
+    'CMAKE_SYSTEM_NAME=Linux',
+    'CMAKE_SYSTEM_VERSION=1',
+    'CMAKE_SYSTEM_PROCESSOR=armv7-a', # ALWAYS ARMv7
+    'CMAKE_FIND_ROOT_PATH_MODE_PROGRAM=NEVER', # Use our definitions for compiler tools
+    'CMAKE_FIND_ROOT_PATH_MODE_LIBRARY=ONLY', # Search for libraries and headers in the target directories only
+    'CMAKE_FIND_ROOT_PATH_MODE_INCLUDE=ONLY',
+)
+
+_IOS_OPTIONS = (
+    'IOS_PLATFORM=OS',
+    'CMAKE_SYSTEM_NAME=Darwin',
+    'CMAKE_XCODE_EFFECTIVE_PLATFORMS=-iphoneos',
+    'CMAKE_OSX_ARCHITECTURES=arm64', # ALWAYS ARM64
+    #'CMAKE_OSX_SYSROOT=/Applications/Xcode.app/Contents/Developer/Platforms/iPhoneOS.platform/Developer/SDKs/iPhoneOS.sdk',
+    'CMAKE_OSX_SYSROOT=iphoneos',
+)
+
+
+def _make_default_options(target:BuildTarget):
     config:BuildConfig = target.config
     cxxflags:dict = target.cmake_cxxflags
     ldflags:dict = target.cmake_ldflags
@@ -141,16 +368,10 @@ def _default_options(target:BuildTarget):
     def add_ldflag(flag:str, value=''):
         ldflags[flag] = value
     def get_flags_string(flags:dict):
-        res = ''
         sep = ':' if config.windows else '='
-        for k, v in flags.items():
-            if not v:
-                res += f' {k}'
-            elif k.startswith('-D') and not '=' in k:
-                res += f' {k}={v}'
-            else:
-                res += f' {k}{sep}{v}'
-        return res.lstrip()
+        return ' '.join(k if not v else
+                        f'{k}={v}' if k.startswith('-D') and not '=' in k else
+                        f'{k}{sep}{v}' for k, v in flags.items()).lstrip()
 
     if config.windows:
         add_flag('/EHsc')
@@ -221,114 +442,97 @@ def _default_options(target:BuildTarget):
         "CMAKE_EXPORT_COMPILE_COMMANDS=ON" # for tools like clang-tidy and .vscode intellisense
     ]
     if config.with_tests or (config.test and config.target_matches(target.name)):
-        opt += ["ENABLE_TESTS=ON", "BUILD_TESTS=ON"]
+        opt.extend(("ENABLE_TESTS=ON", "BUILD_TESTS=ON"))
     
     if config.linux or config.raspi or config.oclea or config.mips:
-        opt += _custom_compilers(target)
+        opt.extend(_custom_compilers(target))
     
     if target.enable_fortran_build and config.fortran:
-        opt += [f'CMAKE_Fortran_COMPILER={config.fortran}']
+        opt.append(f'CMAKE_Fortran_COMPILER={config.fortran}')
+
+    if _use_compiler_launcher(target):
+        opt.append(f'CMAKE_C_COMPILER_LAUNCHER="{config.compiler_launcher}"')
+        if target.enable_cxx_build:
+            opt.append(f'CMAKE_CXX_COMPILER_LAUNCHER="{config.compiler_launcher}"')
 
     cxxflags_str = get_flags_string(cxxflags)
     if cxxflags_str and target.enable_cxx_build:
-        opt += [f'CMAKE_CXX_FLAGS="{cxxflags_str}"']
+        opt.append(f'CMAKE_CXX_FLAGS="{cxxflags_str}"')
 
     ldflags_str = get_flags_string(ldflags)
     if ldflags_str:
-        exe_ldflags = ldflags_str
-        if ld_sanitize: exe_ldflags += ' ' + ld_sanitize
-        if ld_coverage: exe_ldflags += ' ' + ld_coverage
-        opt += [
+        exe_ldflags = ' '.join(f for f in (ldflags_str, ld_sanitize, ld_coverage) if f)
+        opt.extend((
             f'CMAKE_EXE_LINKER_FLAGS="{exe_ldflags}"',
             f'CMAKE_MODULE_LINKER_FLAGS="{exe_ldflags}"',
             f'CMAKE_SHARED_LINKER_FLAGS="{exe_ldflags}"',
-            f'CMAKE_STATIC_LINKER_FLAGS="{ldflags_str}"'
-        ]
+        ))
+        # static libs are created by `ar` on GCC/Clang, which rejects linker flags,
+        # only MSVC lib.exe understands options like /LIBPATH or /MACHINE
+        if config.windows:
+            opt.append(f'CMAKE_STATIC_LINKER_FLAGS="{ldflags_str}"')
 
     make = _make_program(target)
     if make: opt.append(f'CMAKE_MAKE_PROGRAM="{make}"')
 
     if config.windows:
-        if config.is_target_arch_x86(): ## need to override the toolset host
+        if config.is_target_arch_x86() and not _is_ninja_build(target): ## need to override the toolset host
             opt.append('CMAKE_GENERATOR_TOOLSET=host=x86')
     elif config.android:
-        opt += config.android.get_cmake_build_opts(target)
+        opt.extend(config.android.get_cmake_build_opts(target))
     elif config.raspi:
-        opt += [
-            'RASPI=TRUE',
-            'CMAKE_SYSTEM_NAME=Linux',
-            'CMAKE_SYSTEM_VERSION=1',
-            'CMAKE_SYSTEM_PROCESSOR=armv7-a', # ALWAYS ARMv7
-            'CMAKE_FIND_ROOT_PATH_MODE_PROGRAM=NEVER', # Use our definitions for compiler tools
-            'CMAKE_FIND_ROOT_PATH_MODE_LIBRARY=ONLY', # Search for libraries and headers in the target directories only
-            'CMAKE_FIND_ROOT_PATH_MODE_INCLUDE=ONLY',
-        ]
+        opt.extend(_RASPI_OPTIONS)
         if target.cmake_raspi_toolchain:
             toolchain = target.source_dir(target.cmake_raspi_toolchain)
             if config.print: console(f'Toolchain: {toolchain}')
-            opt += [f'CMAKE_TOOLCHAIN_FILE="{toolchain}"']
+            opt.append(f'CMAKE_TOOLCHAIN_FILE="{toolchain}"')
     elif config.oclea:
-        opt += config.oclea.get_cmake_build_opts()
+        opt.extend(config.oclea.get_cmake_build_opts())
     elif config.mips:
-        opt += config.mips.get_cmake_build_opts()
+        opt.extend(config.mips.get_cmake_build_opts())
     elif config.macos:
         pass
     elif config.ios:
-        opt += [
-            'IOS_PLATFORM=OS',
-            'CMAKE_SYSTEM_NAME=Darwin',
-            'CMAKE_XCODE_EFFECTIVE_PLATFORMS=-iphoneos',
-            'CMAKE_OSX_ARCHITECTURES=arm64', # ALWAYS ARM64
-            #'CMAKE_OSX_SYSROOT=/Applications/Xcode.app/Contents/Developer/Platforms/iPhoneOS.platform/Developer/SDKs/iPhoneOS.sdk',
-            'CMAKE_OSX_SYSROOT=iphoneos',
-        ]
+        opt.extend(_IOS_OPTIONS)
         if target.cmake_ios_toolchain:
             toolchain = target.source_dir(target.cmake_ios_toolchain)
             if config.print: console(f'Toolchain: {toolchain}')
-            opt += [f'CMAKE_TOOLCHAIN_FILE="{toolchain}"']
+            opt.append(f'CMAKE_TOOLCHAIN_FILE="{toolchain}"')
     return opt
 
 
 def inject_env(target:BuildTarget):
     config:BuildConfig = target.config
-    if config.android:
+    # `cmake --build` translates this to -j, -jobs or /maxcpucount for every generator
+    env = { 'CMAKE_BUILD_PARALLEL_LEVEL': str(config.jobs) }
+    platform = config.platform
+    if platform == 'android':
         config.android.inject_env()
-    elif config.ios:
-        os.environ['IPHONEOS_DEPLOYMENT_TARGET'] = config.ios_version
-    elif config.macos:
-        os.environ['MACOSX_DEPLOYMENT_TARGET'] = config.macos_version
+    elif platform == 'ios':
+        env['IPHONEOS_DEPLOYMENT_TARGET'] = config.ios_version
+    elif platform == 'macos':
+        env['MACOSX_DEPLOYMENT_TARGET'] = config.macos_version
+    update_environ(env)
 
 
 def _build_config(target:BuildTarget, install:bool):
-    conf = f'--config {target.cmake_build_type}'
+    conf = ['--config', target.cmake_build_type]
     if install and target.install_target:
-        conf += f' --target {target.install_target}'
+        conf += ['--target', target.install_target]
+    # overrides CMAKE_BUILD_PARALLEL_LEVEL, which is shared by all concurrent builds
+    jobs = target.config.get_build_jobs() if target.enable_multiprocess_build else 1
+    conf += ['--parallel', str(jobs)]
     return conf
 
 
-def _mp_flags(target:BuildTarget):
-    config:BuildConfig = target.config
-    if not target.enable_multiprocess_build: return ''
-    if config.windows:     return f'/maxcpucount:{config.jobs}'
-    if target.enable_unix_make:   return f'-j{config.jobs}'
-    if target.enable_ninja_build: return ''
-    if config.ios:         return f'-jobs {config.jobs}'
-    if config.macos:       return f'-jobs {config.jobs}'
-    return f'-j{config.jobs}'
-
-
 def _buildsys_flags(target:BuildTarget):
     config:BuildConfig = target.config
     def get_flags():
-        mpf = _mp_flags(target)
-        if config.windows:            return f'/v:m {mpf} /nologo'
-        if target.enable_unix_make:   return mpf
-        if target.enable_ninja_build: return ''
-        if config.android:            return mpf
-        if config.ios or config.macos:
-            if not target.config.verbose:
-                return f'-quiet {mpf}'
-        return mpf
+        if target.enable_unix_make:   return []
+        if _is_ninja_build(target):   return []
+        if config.windows:            return ['/v:m', '/nologo']
+        if config.platform in ('ios', 'macos') and not config.verbose:
+            return ['-quiet']
+        return []
     flags = get_flags()
-    return f'-- {flags}' if flags else ''
-
+    return ['--', *flags] if flags else []
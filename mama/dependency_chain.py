@@ -1,4 +1,4 @@
-import os, concurrent.futures, re
+import os, re
 from typing import List
 
 from mama.build_config import BuildConfig
@@ -8,59 +8,65 @@ from .utils.system import Color, console, error
 
 
 def _get_cmake_path_list(paths):
-    pathlist = '' 
-    for path in paths: pathlist += f'\n    "{path}"'
-    return pathlist
+    return ''.join(f'\n    "{path}"' for path in paths)
+
+
+# exported library extensions which can be linked on each platform
+_LINKABLE_LIB_EXTENSIONS = {
+    'windows': ('.lib',),
+    'android': ('.a', '.so'),
+    'linux':   ('.a', '.so'),
+    'macos':   ('.a', '.dylib', '.bundle'),
+    'ios':     ('.a', '.dylib', '.framework'),
+    'raspi':   ('.a', '.so'),
+    'oclea':   ('.a', '.so'),
+    'mips':    ('.a', '.so'),
+}
 
 
 def _get_exported_libs(target):
-    filtered = []
-    allowed = []
-    if target.windows:
-        allowed = ['.lib']
-    elif target.android:
-        allowed = ['.a', '.so']
-    elif target.linux: # TODO: android builds on Linux are impossible with this approach 
-        allowed = ['.a', '.so']
-    elif target.macos:
-        allowed = ['.a', '.dylib', '.bundle']
-    elif target.ios:
-        allowed = ['.a', '.dylib', '.framework']
-    elif target.raspi or target.oclea or target.mips:
-        allowed = ['.a', '.so']
-
-    #print(f'{target.name: <16} exported: {target.exported_libs}')
-    for lib in target.exported_libs:
-        for ext in allowed:
-            if lib.endswith(ext):
-                filtered.append(lib)
+    allowed = _LINKABLE_LIB_EXTENSIONS.get(target.config.platform, ())
+    filtered = [lib for lib in target.exported_libs if lib.endswith(allowed)]
     #print(f'{target.name: <16} filtered: {filtered}')
     return filtered
 
 
-def _get_hierarchical_libs(root: BuildDependency):
-    deps = []
-    syslibs = []
-    def add_deps(dep: BuildDependency):
-        nonlocal deps, syslibs
-        deps += _get_exported_libs(dep.target)
-        syslibs += dep.target.exported_syslibs
-        for child in dep.get_children():
-            add_deps(child)
-    add_deps(root)
-    return deps + syslibs
+def _get_hierarchical_libs(root: BuildDependency, memo: dict):
+    """
+    Gets unique libs of root and all of its children, followed by all of their syslibs.
+    `memo` holds (libs, syslibs) of every dep already visited during this save,
+    so shared subtrees are only walked once
+    """
+    def get_libs(dep: BuildDependency):
+        libs = memo.get(dep)
+        if libs is None:
+            deps = _get_exported_libs(dep.target)
+            syslibs = list(dep.target.exported_syslibs)
+            for child in dep.get_children():
+                child_deps, child_syslibs = get_libs(child)
+                deps += child_deps
+                syslibs += child_syslibs
+            libs = memo[dep] = (deps, syslibs)
+        return libs
+    deps, syslibs = get_libs(root)
+    # a lib shared by several deps is listed once per parent; keep only its last occurrence,
+    # which is still after every lib that needs it, as required by Unix linkers
+    return list(reversed(dict.fromkeys(reversed(deps + syslibs))))
 
 
 def _get_flattened_deps(root: BuildDependency):
     # deps have to be sorted in [parent] [child] order for Unix linkers
+    # reversed postorder places each dep after all of its parents and visits it only once
+    seen = set()
     ordered = []
     def add_unique_items(deps: List[BuildDependency]):
-        for child in deps:
-            if child in ordered: # already in deps list, so we need to move it lower
-                ordered.remove(child)
-            ordered.append(child)
-            add_unique_items(child.get_children())
+        for child in reversed(deps):
+            if child not in seen:
+                seen.add(child)
+                add_unique_items(child.get_children())
+                ordered.append(child)
     add_unique_items(root.get_children())
+    ordered.reverse()
     return ordered
 
 
@@ -198,10 +204,10 @@ def _save_vscode_compile_commands(dep: BuildDependency):
             console(f'Updated c_cpp_properties.json "{platform_config["name"]}" compileCommands')
 
 
-def _get_dependency_cmake_defines(dep: BuildDependency):
+def _get_dependency_cmake_defines(dep: BuildDependency, libs_memo: dict):
     name = dep.name
     own_libs = _get_exported_libs(dep.target) + dep.target.exported_syslibs
-    all_libs = _get_hierarchical_libs(dep)
+    all_libs = _get_hierarchical_libs(dep, libs_memo)
 
     includes = _get_cmake_path_list(dep.target.exported_includes)
     own_libs_list = _get_cmake_path_list(own_libs)
@@ -227,30 +233,30 @@ def _save_dependencies_cmake(root: BuildDependency):
     if not root.build_dir_exists():
         return # probably CLEAN, so nothing to save
     outfile = f'{root.build_dir}/mama-dependencies.cmake'
-    text = \
-'''
+    text = ['''
 # This file is auto-generated by mama build. Do not modify by hand!
-'''
-    includes_def, package_text = _get_dependency_cmake_defines(root)
+''']
+    libs_memo = {} # exported libs can change after a build, so they're only reused within this save
+    includes_def, package_text = _get_dependency_cmake_defines(root, libs_memo)
     includes_defs = [includes_def]
-    text += package_text
+    text.append(package_text)
 
     root.flattened_deps = _get_flattened_deps(root)
     for dep in root.flattened_deps:
-        includes_def, package_text = _get_dependency_cmake_defines(dep)
+        includes_def, package_text = _get_dependency_cmake_defines(dep, libs_memo)
         includes_defs.append(includes_def)
-        text += package_text
+        text.append(package_text)
 
     # and finally, set the MAMA_INCLUDES and MAMA_LIBS
     includes = ' '.join(includes_defs)
     libs = f'${{{root.name}_LIBS}}' # use the root package to get the full flat list of deps
-    text += \
+    text.append(
 f'''
 set(MAMA_INCLUDES ${{MAMA_INCLUDES}} {includes})
 set(MAMA_LIBS     ${{MAMA_LIBS}}     {libs})
-'''
+''')
 
-    save_file_if_contents_changed(outfile, text)
+    save_file_if_contents_changed(outfile, ''.join(text))
 
 
 def _save_mama_cmake(root: BuildDependency):
@@ -369,30 +375,62 @@ endif()
     save_file_if_contents_changed(_mama_cmake_path(root), text)
 
 
-def load_dependency_chain(root: BuildDependency):
+def _load_dependency(dep: BuildDependency):
+    if dep.already_loaded:
+        return dep.should_rebuild
+    changed = dep.load()
+    for child in dep.get_children():
+        changed |= _load_dependency(child)
+    dep.after_load()
+    return changed
+
+
+def _load_dependency_chain_parallel(root: BuildDependency):
     """
-    This is main entrypoint for building the dependency chain.
-    All dependencies must be resolved at this stage
+    Loads every dependency as soon as its parent has declared it, so that
+    independent git clones/pulls and artifactory fetches overlap.
+    Workers never wait on each other, only this scheduler thread does.
     """
-    with concurrent.futures.ThreadPoolExecutor() as e:
-        def load_dependency(dep: BuildDependency):
-            if dep.already_loaded:
-                return dep.should_rebuild
-
-            changed = dep.load()
-            if dep.config.parallel_load:
-                futures = []
+    import concurrent.futures # only the parallel modes need it
+    loaded = set()
+    max_workers = max(8, root.config.jobs) # loading is mostly network and disk bound
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as e:
+        def submit(dep: BuildDependency):
+            if dep not in loaded and not dep.already_loaded:
+                loaded.add(dep)
+                running[e.submit(dep.load)] = dep
+
+        running = {}
+        submit(root)
+        while running:
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for f in done:
+                dep = running.pop(f)
+                f.result() # rethrow any load errors
                 for child in dep.get_children():
-                    futures.append(e.submit(load_dependency, child))
-                for f in futures:
-                    changed |= f.result()
-            else:
-                for child in dep.get_children():
-                    changed |= load_dependency(child)
+                    submit(child)
 
+    # after_load() needs final should_rebuild of all children, so visit in [child] [parent] order
+    visited = set()
+    def after_load(dep: BuildDependency):
+        if dep in visited: return
+        visited.add(dep)
+        for child in dep.get_children():
+            after_load(child)
+        if dep in loaded:
             dep.after_load()
-            return changed
-        load_dependency(root)
+    after_load(root)
+
+
+def load_dependency_chain(root: BuildDependency):
+    """
+    This is main entrypoint for building the dependency chain.
+    All dependencies must be resolved at this stage
+    """
+    if root.config.parallel_load:
+        _load_dependency_chain_parallel(root)
+    else:
+        _load_dependency(root)
 
 
 def print_dependencies(root: BuildDependency):
@@ -414,43 +452,87 @@ def print_dependencies(root: BuildDependency):
         console(f'  - {root.name} Exported Libs: <none>')
 
 
-def execute_task_chain(flat_deps_reverse: List[BuildDependency]):
-    for dep in flat_deps_reverse:
-        if not os.path.exists(_mama_cmake_path(dep)):
-            _save_mama_cmake_and_dependencies_cmake(dep) # save a dummy mama.cmake before build
+def _execute_dependency_tasks(dep: BuildDependency):
+    if dep.config.verbose:
+        console(f'  - Execute Tasks: {dep.name}', color=Color.BLUE)
+
+    # validate we're not building twice
+    if dep.already_executed:
+        error(f"Critical Error: '{dep.name}' executed by child project")
+        raise RuntimeError(f"Cyclical Dependency detected for '{dep.name}'")
 
-        if dep.config.verbose:
-            console(f'  - Execute Tasks: {dep.name}', color=Color.BLUE)
+    # go through all child deps and make sure they executed
+    for c in dep.get_children():
+        if not c.already_executed:
+            error(f"Critical Error: child '{c.name}' has not been executed before executing target '{dep.name}'")
+            raise RuntimeError(f"Child target not executed before target which requires it: {c.name}")
 
-        # validate we're not building twice
-        if dep.already_executed:
-            error(f"Critical Error: '{dep.name}' executed by child project")
-            raise RuntimeError(f"Cyclical Dependency detected for '{dep.name}'")
+    # mama.cmake and mama-dependencies.cmake must exist before the build
+    _save_mama_cmake_and_dependencies_cmake(dep)
+    dep.target._execute_tasks()
 
-        # go through all child deps and make sure they executed
-        for c in dep.get_children():
-            if not c.already_executed:
-                error(f"Critical Error: child '{c.name}' has not been executed before executing target '{dep.name}'")
-                raise RuntimeError(f"Child target not executed before target which requires it: {c.name}")
+    # saves a helper autocomplete includes txt file to make adding .vscode include paths easier
+    _save_vscode_compile_commands(dep)
 
-        _save_mama_cmake_and_dependencies_cmake(dep)
-        dep.target._execute_tasks()
+    if dep.config.verbose and not dep.config.test:
+        if dep.is_root_or_config_target():
+            print_dependencies(dep)
+        # else:
+        #     print_dependencies(dep) # TODO: different output for non-root targets
 
-        # saves a helper autocomplete includes txt file to make adding .vscode include paths easier
-        _save_vscode_compile_commands(dep)
 
-        if dep.config.verbose and not dep.config.test:
-            if dep.is_root_or_config_target():
-                print_dependencies(dep)
-            # else:
-            #     print_dependencies(dep) # TODO: different output for non-root targets
+def _execute_task_chain_parallel(flat_deps_reverse: List[BuildDependency]):
+    """
+    Executes each dependency as soon as all of its children have finished,
+    so independent dependencies configure and build concurrently.
+    """
+    import concurrent.futures
+    config = flat_deps_reverse[0].config
+    pending = list(flat_deps_reverse)
+    finished = set()
+    running = dict()
+    # each build runs its own parallel compile jobs, so split `jobs` between the concurrent builds
+    # instead of asking for jobs*jobs processes, eg 16 jobs -> 4 builds with 4 jobs each
+    max_workers = max(1, min(len(pending), int(config.jobs ** 0.5)))
+    config.build_jobs = max(1, config.jobs // max_workers)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as e:
+            while pending or running:
+                ready = [d for d in pending if all(c in finished for c in d.get_children())]
+                for dep in ready:
+                    pending.remove(dep)
+                    running[e.submit(_execute_dependency_tasks, dep)] = dep
+                if not running:
+                    names = ', '.join(d.name for d in pending)
+                    raise RuntimeError(f'Cyclical Dependency detected between: {names}')
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for f in done:
+                    dep = running.pop(f)
+                    f.result() # rethrow any build errors
+                    finished.add(dep)
+    finally:
+        config.build_jobs = 0
+
+
+def execute_task_chain(flat_deps_reverse: List[BuildDependency]):
+    if flat_deps_reverse and flat_deps_reverse[0].config.parallel_build:
+        _execute_task_chain_parallel(flat_deps_reverse)
+    else:
+        for dep in flat_deps_reverse:
+            _execute_dependency_tasks(dep)
 
 
 def find_dependency(root: BuildDependency, name: str) -> BuildDependency:
     """ This is mainly used for finding root target or specific command line target """
-    if root.name.lower() == name.lower():
-        return root
-    for dep in root.get_children():
-        found = find_dependency(dep, name)
-        if found: return found
-    return None
+    name = name.lower()
+    visited = set() # shared subtrees only need to be searched once
+    def search(dep: BuildDependency):
+        if dep.name.lower() == name:
+            return dep
+        for child in dep.get_children():
+            if child not in visited:
+                visited.add(child)
+                found = search(child)
+                if found: return found
+        return None
+    return search(root)
@@ -58,6 +58,8 @@ def print_usage():
     console('    arch=x86   - Override cross-compiling architecture: (x86, x64, arm, arm64)')
     console('    x86        - Shorthand for arch=x86, all shorthands: x86 x64 arm arm64')
     console('    jobs=N     - Max number of parallel compilations. (default=system.core.count)')
+    console('    parallel_build - Configure and build independent dependencies in parallel')
+    console('    noccache   - Do not use ccache or sccache as the compiler launcher, even if found')
     console('    target=P   - Name of the target')
     console('    all        - Short for target=all')
     console('    with_tests - Forces CMake option -DENABLE_TESTS=ON and -DBUILD_TESTS=ON')
@@ -34,10 +34,7 @@ def _check_default_properties(config: BuildConfig, properties: dict):
 
 
 def _get_msbuild_options(properties):
-    result = '/nologo'
-    for key, value in properties.items():
-        result += f' /p:{key}={value}'
-    return result
+    return ' '.join(['/nologo'] + [f'/p:{key}={value}' for key, value in properties.items()])
 
 
 def msbuild_build(config: BuildConfig, projectfile: str, properties: dict):
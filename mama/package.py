@@ -1,8 +1,8 @@
 from __future__ import annotations
 from typing import List, TYPE_CHECKING
-import os
+import os, functools
 from .utils.system import console, System
-from .util import normalized_path, glob_with_name_match, glob_with_extensions
+from .util import glob_with_name_match, glob_with_extensions
 from .types.asset import Asset
 
 if TYPE_CHECKING:
@@ -26,7 +26,18 @@ def is_a_library(lib: str):
 
 def target_root_path(target: BuildTarget, path: str, build_dir: bool):
     root = target.build_dir() if build_dir else target.source_dir()
-    return normalized_path(os.path.join(root, path))
+    # root is already absolute, so normpath gives the same result as abspath
+    return os.path.normpath(os.path.join(root, path)).replace('\\', '/').rstrip()
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_glob_with_name_match(root_path: str, pattern_substrings: tuple):
+    return glob_with_name_match(root_path, pattern_substrings)
+
+
+def clear_glob_cache():
+    """ Must be called whenever build outputs change, eg after build or clean """
+    _cached_glob_with_name_match.cache_clear()
 
 
 def get_lib_basename(lib: str|tuple):
@@ -134,7 +145,7 @@ def clean_intermediate_files(target: BuildTarget):
 
 def export_libs(target: BuildTarget, path, pattern_substrings: List[str], build_dir: bool, order: list):
     root_path = target_root_path(target, path, build_dir=build_dir)
-    libs = glob_with_name_match(root_path, pattern_substrings)
+    libs = _cached_glob_with_name_match(root_path, tuple(pattern_substrings))
     libs = cleanup_libs_list(libs)
 
     # ignore root_path/deploy
@@ -1,12 +1,13 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING
-import os, zipfile, shutil
+import os, shutil
 
 from .artifactory import artifactory_archive_name, artifactory_upload_ftp
 from .util import get_file_size_str, console, normalized_join
 from .papa_deploy import PapaFileInfo
 
 if TYPE_CHECKING:
+    import zipfile
     from .build_target import BuildTarget
 
 
@@ -32,6 +33,7 @@ def papa_upload_to(target:BuildTarget, package_full_path:str):
     - target: Target which was configured and packaged
     - package_full_path: Full path to deployed PAPA package
     """
+    import zipfile
     package_full_path = package_full_path if package_full_path else target.build_dir()
     papa_file = normalized_join(package_full_path, 'papa.txt')
     if not os.path.exists(papa_file):
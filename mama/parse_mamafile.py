@@ -1,7 +1,7 @@
 import os, runpy, inspect
 
 from .utils.system import console
-from .util import path_join, read_text_from, write_text_to
+from .util import path_join, read_text_from, write_text_to, file_content_hash
 
 def parse_mamafile(config, target_class, mamafile):
     if not mamafile or not os.path.exists(mamafile):
@@ -25,13 +25,18 @@ def update_modification_tag(config, file, tagfile):
     if not os.path.exists(tagfile):
         os.makedirs(os.path.dirname(tagfile), exist_ok=True)
         if config.verbose: console(f'Update tagfile: {tagfile}')
-        write_text_to(tagfile, filetime_str)
+        write_text_to(tagfile, f'{filetime_str} {file_content_hash(file)}')
         return True
 
-    if filetime_str != read_text_from(tagfile):
-        if config.verbose: console(f'Update tagfile: {tagfile}')
-        write_text_to(tagfile, filetime_str)
-        return True
+    # tag is `mtime hash`, the mtime is only a fast path, since
+    # git checkout and other tools can touch the file without changing it
+    old_tag = read_text_from(tagfile).split()
+    if not old_tag or filetime_str != old_tag[0]:
+        content_hash = file_content_hash(file)
+        write_text_to(tagfile, f'{filetime_str} {content_hash}')
+        if len(old_tag) != 2 or content_hash != old_tag[1]:
+            if config.verbose: console(f'Update tagfile: {tagfile}')
+            return True
 
     if config.verbose: console(f'No Changes {file}')
     return False
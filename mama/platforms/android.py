@@ -1,7 +1,7 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, Callable
 import os
-from mama.utils.system import System, console
+from mama.utils.system import System, console, update_environ
 
 if TYPE_CHECKING:
     from ..build_config import BuildConfig
@@ -17,6 +17,8 @@ class Android:
         self.android_api = 'android-29' # 29: Android 10.0 (2020)
         self.android_ndk_stl = 'c++_shared' # LLVM libc++
         self.ndk_version = 'ndk'
+        self._env = None
+        self._env_key = None
 
 
     def android_abi(self):
@@ -203,17 +205,28 @@ Or define env ANDROID_HOME with path to Android SDK root with valid NDK-s.''')
             if self.config.print:
                 console(f'Toolchain: {toolchain}')
 
+        # Ninja builds already get CMAKE_MAKE_PROGRAM=ninja, which must not be overridden by NDK make
+        uses_ninja = target.enable_ninja_build and not target.enable_unix_make
         make = self._get_make()
-        if make: opts.append(f'CMAKE_MAKE_PROGRAM="{make}"')
+        if make and not uses_ninja: opts.append(f'CMAKE_MAKE_PROGRAM="{make}"')
         return opts
 
     # injects android specific env vars
     def inject_env(self):
-        make = self._get_make()
-        if make: os.environ['CMAKE_MAKE_PROGRAM'] = make
-        os.environ['ANDROID_HOME'] = self.android_home()
-        os.environ['ANDROID_NDK'] = self.android_ndk()
-        os.environ['ANDROID_ABI'] = self.android_abi()
-        os.environ['ANDROID_STL'] = self.android_ndk_stl
-        os.environ['ANDROID_NATIVE_API_LEVEL'] = self.android_api
-        os.environ['ANDROID_TOOLCHAIN'] = 'clang'
+        # every dependency build injects the same env, so only rebuild it if the settings changed
+        key = (self.android_home(), self.android_ndk(), self.config.arch,
+               self.android_ndk_stl, self.android_api)
+        if self._env_key != key:
+            env = {
+                'ANDROID_HOME': self.android_home(),
+                'ANDROID_NDK': self.android_ndk(),
+                'ANDROID_ABI': self.android_abi(),
+                'ANDROID_STL': self.android_ndk_stl,
+                'ANDROID_NATIVE_API_LEVEL': self.android_api,
+                'ANDROID_TOOLCHAIN': 'clang',
+            }
+            make = self._get_make()
+            if make: env['CMAKE_MAKE_PROGRAM'] = make
+            self._env = env
+            self._env_key = key
+        update_environ(self._env)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING
 
-import os, shutil, stat, string
+import os, shlex, shutil, stat, string
 from .dep_source import DepSource
 from ..utils.system import Color, System, console, error
 from ..utils.sub_process import SubProcess, execute, execute_piped, execute_piped_echo
@@ -62,10 +62,9 @@ class Git(DepSource):
 
 
     def run_git(self, dep: BuildDependency, git_command, throw=True):
-        cmd = f"cd {dep.src_dir} && git {git_command}"
         if dep.config.verbose:
             console(f'  {dep.name: <16} git {git_command}', color=Color.YELLOW)
-        return execute(cmd, throw=throw)
+        return execute(['git', *shlex.split(git_command)], cwd=dep.src_dir, throw=throw)
 
 
     def get_commit_hash(self, dep: BuildDependency, use_cache=True):
@@ -207,16 +206,18 @@ class Git(DepSource):
 
 
     def clone_with_filtered_progress(self, dep: BuildDependency, clone_args: str, clone_to_dir: str):
-        output = ''
+        output = []
         current_percent = -1
+        # concurrent clones would overwrite each other's progress line, so only report the result
+        show_progress = dep.config.print and not dep.config.parallel_load
         def print_output(p:SubProcess, line:str):
-            nonlocal output, current_percent
+            nonlocal current_percent
             if 'remote: Counting objects:' in line or \
                 'remote: Compressing objects:' in line or \
                 'Receiving objects:' in line or \
                 'Resolving deltas:' in line or \
                 'Updating files:' in line:
-                if dep.config.print:
+                if show_progress:
                     parts = line.split('%')[0].split(':')
                     if not parts:
                         console(line)
@@ -240,8 +241,8 @@ class Git(DepSource):
                 console(line)
                 p.write('yes\n') # get us unstuck
             elif line:
-                output += line
-                output += '\n'
+                output.append(line)
+                output.append('\n')
                 if dep.config.verbose:
                     console(line)
 
@@ -252,6 +253,7 @@ class Git(DepSource):
         result = SubProcess.run(cmd, io_func=print_output)
 
         # handle the result:
+        output = ''.join(output)
         if dep.config.print:
             if result == 0:
                 console(f'\r  - Target {dep.name: <16} CLONE SUCCESS                  ', color=Color.BLUE)
@@ -1,15 +1,14 @@
-import os, stat, shutil, zipfile
+import os, stat, shutil, threading, hashlib
 from typing import List
-import time, ssl, pathlib, random
+import time, pathlib, random
 from .utils.system import System, console
-from .utils.sub_process import execute
-from urllib import request
+from urllib.error import HTTPError
 from datetime import datetime
-from dateutil import tz
 
 def is_file_modified(src: str, dst: str):
-    return os.path.getmtime(src) == os.path.getmtime(dst) and\
-           os.path.getsize(src) == os.path.getsize(dst)
+    src_stat, dst_stat = os.stat(src), os.stat(dst)
+    return src_stat.st_mtime == dst_stat.st_mtime and\
+           src_stat.st_size == dst_stat.st_size
 
 
 def find_executable_from_system(name: str):
@@ -47,16 +46,18 @@ def deploy_framework(framework: str, deployFolder: str):
         name = os.path.basename(framework)
         deployPath = os.path.join(deployFolder, name)
         console(f'Deploying framework to {deployPath}')
-        execute(f'rm -rf {deployPath}')
+        shutil.rmtree(deployPath, ignore_errors=True)
         shutil.copytree(framework, deployPath)
         return True
     return False
 
 
 def has_contents_changed(filename: str, new_contents: str):
-    if not os.path.exists(filename):
+    # just try to read it, exists() + read is an extra stat and can race with parallel builds
+    try:
+        return read_text_from(filename) != new_contents
+    except FileNotFoundError:
         return True
-    return read_text_from(filename) != new_contents
 
 
 def save_file_if_contents_changed(filename: str, new_contents: str) -> bool:
@@ -96,15 +97,27 @@ def normalized_join(path1: str, *pathsN) -> str:
     return normalized_path(os.path.join(path1, *pathsN))
 
 
+def _walk_normalized(rootdir: str):
+    """
+    os.walk() which yields normalized (absolute, forward/ slash) dirpaths,
+    so that entries don't need to go through normalized_path() one by one
+    """
+    for dirpath, dirnames, dirfiles in os.walk(os.path.abspath(rootdir)):
+        yield dirpath.replace('\\', '/'), dirnames, dirfiles
+
+
+def _normalized_entry(dirpath: str, name: str) -> str:
+    # same result as normalized_path(os.path.join(dirpath, name)) for already normalized dirpath
+    return (dirpath + name if dirpath.endswith('/') else f'{dirpath}/{name}').rstrip()
+
+
 def glob_with_extensions(rootdir: str, extensions: List[str]) -> List[str]:
     results = []
-    for dirpath, _, dirfiles in os.walk(rootdir):
+    extensions = frozenset(extensions)
+    for dirpath, _, dirfiles in _walk_normalized(rootdir):
         for file in dirfiles:
-            _, fext = os.path.splitext(file)
-            if fext in extensions:
-                pathstring = os.path.join(dirpath, file)
-                pathstring = normalized_path(pathstring)
-                results.append(pathstring)
+            if os.path.splitext(file)[1] in extensions:
+                results.append(_normalized_entry(dirpath, file))
     return results
 
 
@@ -120,18 +133,14 @@ def strstr_multi(s: str, substrings: List[str]) -> bool:
 
 def glob_with_name_match(rootdir: str, pattern_substrings: list, match_dirs=True) -> List[str]:
     results = []
-    for dirpath, dirnames, dirfiles in os.walk(rootdir):
+    for dirpath, dirnames, dirfiles in _walk_normalized(rootdir):
         if match_dirs:
             for dir in dirnames:
                 if strstr_multi(dir, pattern_substrings):
-                    pathstring = os.path.join(dirpath, dir)
-                    pathstring = normalized_path(pathstring)
-                    results.append(pathstring)
+                    results.append(_normalized_entry(dirpath, dir))
         for file in dirfiles:
             if strstr_multi(file, pattern_substrings):
-                pathstring = os.path.join(dirpath, file)
-                pathstring = normalized_path(pathstring)
-                results.append(pathstring)
+                results.append(_normalized_entry(dirpath, file))
     return results
 
 
@@ -150,9 +159,10 @@ def is_dir_empty(dir: str): # no files?
 
 
 def has_tag_changed(old_tag_file: str, new_tag: str):
-    if not os.path.exists(old_tag_file):
+    try:
+        old_tag = read_text_from(old_tag_file)
+    except FileNotFoundError:
         return True
-    old_tag = read_text_from(old_tag_file)
     if old_tag != new_tag:
         console(f" tagchange '{old_tag.strip()}'\n"+
                 f"      ---> '{new_tag.strip()}'")
@@ -160,22 +170,34 @@ def has_tag_changed(old_tag_file: str, new_tag: str):
     return False
 
 
+def file_content_hash(file_path: str) -> str:
+    """ Short blake2b hash of the file contents, for tags which must not depend on mtime """
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024*1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 def read_text_from(file_path: str) -> str:
     return pathlib.Path(file_path).read_text()
 
 
 def write_text_to(file: str, text: str):
-    dirname = os.path.dirname(file)
-    if not os.path.exists(dirname):
-        os.makedirs(dirname, exist_ok=True)
-    pathlib.Path(file).write_text(text, encoding='utf-8')
+    path = pathlib.Path(file)
+    try:
+        path.write_text(text, encoding='utf-8')
+    except FileNotFoundError: # the directory doesn't exist yet
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        path.write_text(text, encoding='utf-8')
 
 
 def read_lines_from(file: str) -> List[str]:
-    if not os.path.exists(file):
+    try:
+        with pathlib.Path(file).open(encoding='utf-8') as f:
+            return f.readlines()
+    except FileNotFoundError:
         return []
-    with pathlib.Path(file).open(encoding='utf-8') as f:
-        return f.readlines()
 
 
 def get_file_size_str(size):
@@ -196,6 +218,50 @@ def get_time_str(seconds: float):
     return f'{int(seconds/(24*60*60))}d {int((seconds%(24*60*60))/(60*60))}h {int(seconds/60)%60}m {int(seconds)%60}s'
 
 
+http_pools = {} # proxy url (None for direct connections) -> urllib3 pool manager
+http_ssl_context = None
+http_pool_lock = threading.Lock()
+def _get_http_pool(remote_url: str):
+    """
+    Shared urllib3 pool, which keeps TCP+TLS connections alive between downloads.
+    Like urllib.request.urlopen, it honors HTTP_PROXY, HTTPS_PROXY and NO_PROXY.
+    """
+    import urllib.request, urllib.parse
+    url = urllib.parse.urlsplit(remote_url)
+    proxy = urllib.request.getproxies().get(url.scheme)
+    if proxy and urllib.request.proxy_bypass(url.hostname or ''):
+        proxy = None
+    if proxy and '://' not in proxy:
+        proxy = 'http://' + proxy # urllib also accepts `host:port` proxies
+
+    global http_ssl_context
+    with http_pool_lock: # parallel dependency loading can download concurrently
+        pool = http_pools.get(proxy)
+        if not pool: # lazy init, because loading certs is slow
+            import urllib3
+            from urllib3.util.ssl_ import create_urllib3_context
+            # one context for all host pools, so the CA bundle is parsed only once
+            if not http_ssl_context:
+                http_ssl_context = create_urllib3_context()
+                http_ssl_context.load_default_certs()
+            # TODO: hostname check causes issues inside some secure networks
+            # maxsize matches the parallel loader's minimum worker count,
+            # so concurrent artifactory fetches from one host can all keep their connections
+            options = dict(num_pools=16, maxsize=8, cert_reqs='CERT_REQUIRED',
+                           assert_hostname=False, ssl_context=http_ssl_context)
+            if proxy:
+                auth = urllib3.util.parse_url(proxy).auth
+                headers = urllib3.make_headers(proxy_basic_auth=auth) if auth else None
+                pool = urllib3.ProxyManager(proxy, proxy_headers=headers, **options)
+            else:
+                pool = urllib3.PoolManager(**options)
+            http_pools[proxy] = pool
+    return pool
+
+
+DOWNLOAD_CHUNK_SIZE = 1024*1024
+
+
 def download_file(remote_url:str, local_dir:str, force=False, message=None):
     local_file = os.path.join(local_dir, os.path.basename(remote_url))
     if not force and os.path.exists(local_file): # download file?
@@ -205,16 +271,11 @@ def download_file(remote_url:str, local_dir:str, force=False, message=None):
     if not os.path.exists(local_dir):
         os.makedirs(local_dir, exist_ok=True)
 
-    # TODO: this causes issues inside some secure networks
-    if remote_url.startswith('https://'):
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_OPTIONAL
-    else:
-        ctx = None
-
-    with request.urlopen(remote_url, context=ctx, timeout=15) as urlfile:
-        size = urlfile.info()['Content-Length']
+    urlfile = _get_http_pool(remote_url).request('GET', remote_url, preload_content=False, timeout=15)
+    try:
+        if urlfile.status >= 400:
+            raise HTTPError(remote_url, urlfile.status, urlfile.reason, urlfile.headers, None)
+        size = urlfile.headers.get('Content-Length')
         size = int(size.strip()) if size else None
         if not message: message = f'Downloading {remote_url}'
         print(f'{message} {get_file_size_str(size) if size else "unknown size"}')
@@ -225,24 +286,24 @@ def download_file(remote_url:str, local_dir:str, force=False, message=None):
         # for 10MB file, interval = 10
         # for 1MB file, interval = 100 (so essentially disabled)
         report_interval = max(1, int((100*1024*1024) / size))
+        # progress is only formatted once transferred crosses the next report threshold
+        next_report = (size * report_interval) // 100 if report_interval < 100 else size + 1
         transferred = 0
-        lastpercent = 0
         print(f'    |{" ":50}<| {0:>3}%', end='')
         with open(local_file, 'wb') as output:
-            while transferred < size:
-                data = urlfile.read(32*1024) # large chunks plz
-                if not data: break
+            for data in urlfile.stream(DOWNLOAD_CHUNK_SIZE, decode_content=False):
                 output.write(data)
                 transferred += len(data)
-                if report_interval < 100:
+                if transferred >= next_report:
                     percent = int((transferred / size) * 100.0)
-                    if abs(lastpercent - percent) >= report_interval:
-                        lastpercent = percent
-                        n = int(percent / 2)
-                        right = '=' * n
-                        left = ' ' * int(50 - n)
-                        elapsed = time.time() - start
-                        print(f'\r    |{left}<{right}| {percent:>3}% ({get_time_str(elapsed)})', end='')
+                    next_report = (size * (percent + report_interval)) // 100
+                    n = int(percent / 2)
+                    right = '=' * n
+                    left = ' ' * int(50 - n)
+                    elapsed = time.time() - start
+                    print(f'\r    |{left}<{right}| {percent:>3}% ({get_time_str(elapsed)})', end='')
+    finally:
+        urlfile.release_conn() # return the connection to the pool for reuse
 
     # report actual percent here, just incase something goes wrong
     elapsed = time.time() - start
@@ -251,18 +312,27 @@ def download_file(remote_url:str, local_dir:str, force=False, message=None):
     return local_file
 
 
-def unzip(local_zip: str, extract_dir: str, pwd: str = None):
+UNZIP_CHUNK_SIZE = 1024*1024
+
+
+def unzip(local_zip: str, extract_dir: str, pwd: str = None, max_workers: int = None):
     """
     Attempts to unzip an archive, throws on failure.
     Only extracts the files if their current size or modified time mismatches.
     Always sets modified time from the zipfile info.
     Preserves symlinks. And sets the correct file permission attributes.
+    Modified files are extracted in parallel using up to `max_workers` threads.
     Returns # of files actually extracted.
     """
+    # imported lazily, most mama invocations never unzip anything
+    import zipfile, concurrent.futures
+    from dateutil import tz
+    local_tz = tz.tzlocal() # constructing tzlocal is slow, so share it for all members
+
     def get_zipinfo_datetime(zipmember: zipfile.ZipInfo) -> datetime:
         zt = zipmember.date_time # tuple: year, month, day, hour, min, sec
         # ZIP uses localtime
-        return datetime(zt[0], zt[1], zt[2], zt[3], zt[4], zt[5], tzinfo=tz.tzlocal())
+        return datetime(zt[0], zt[1], zt[2], zt[3], zt[4], zt[5], tzinfo=local_tz)
 
     def has_file_changed(zipmember: zipfile.ZipInfo, dst_path):
         st: os.stat_result = None
@@ -270,17 +340,14 @@ def unzip(local_zip: str, extract_dir: str, pwd: str = None):
             st = os.stat(dst_path, follow_symlinks=False)
             if st.st_size != zipmember.file_size:
                 return True
-            dst_mtime: datetime = datetime.fromtimestamp(st.st_mtime, tz=tz.tzlocal())
-            src_mtime = get_zipinfo_datetime(zipmember)
-            if dst_mtime != src_mtime:
+            if st.st_mtime != get_zipinfo_datetime(zipmember).timestamp():
                 return True
         except (OSError, ValueError):
             return True # does not exist
         return False
 
     # creates a symlink only if necessary
-    def make_symlink(zipmember: zipfile.ZipInfo, symlink_location, is_directory):
-        target = zip.read(zipmember, pwd=pwd).decode('utf-8')
+    def make_symlink(target: str, symlink_location, is_directory):
         # link does not exist, recreate it
         if not os.path.islink(symlink_location):
             if os.path.exists(symlink_location):
@@ -299,7 +366,36 @@ def unzip(local_zip: str, extract_dir: str, pwd: str = None):
         what = what + ' LINK' if is_symlink else what
         print(f'{what} {zipmember.filename} S_IMODE={stat.S_IMODE(mode):0o} S_IFMT={stat.S_IFMT(mode):0o}')
 
+    def set_file_attributes(zipmember: zipfile.ZipInfo, dst_path):
+        # set the correct permissions for files and folders
+        perm = stat.S_IMODE(zipmember.external_attr >> 16)
+        os.chmod(dst_path, perm)
+        # always set the modification date from the zipmember timestamp,
+        # this way we can avoid unnecessarily modifying files and causing full rebuilds
+        time = get_zipinfo_datetime(zipmember)
+        #print(f'    | {dst_path} {time}')
+        mtime = time.timestamp()
+        if System.windows:
+            os.utime(dst_path, times=(mtime, mtime))
+        else:
+            os.utime(dst_path, times=(mtime, mtime), follow_symlinks=False)
+
+    # ZipFile is not thread-safe, so each worker thread opens its own handle
+    local = threading.local()
+    worker_zips = []
+    def extract_file(zipmember: zipfile.ZipInfo, dst_path):
+        wzip = getattr(local, 'zip', None)
+        if wzip is None:
+            wzip = local.zip = zipfile.ZipFile(local_zip, "r")
+            worker_zips.append(wzip)
+        with wzip.open(zipmember, pwd=pwd) as src, open(dst_path, "wb") as dst:
+            # large chunks keep the decompress+CRC loop inside zlib instead of python
+            shutil.copyfileobj(src, dst, UNZIP_CHUNK_SIZE)
+        set_file_attributes(zipmember, dst_path)
+
     num_unzipped = 0
+    files_to_extract = []
+    symlinks_to_create = []
 
     with zipfile.ZipFile(local_zip, "r") as zip:
         for zipmember in zip.infolist():
@@ -309,37 +405,50 @@ def unzip(local_zip: str, extract_dir: str, pwd: str = None):
             did_extract = False
             if zipmember.is_dir():  # make dirs if needed
                 if is_symlink:
-                    did_extract = make_symlink(zipmember, dst_path, is_directory=True)
+                    did_extract = make_symlink(zip.read(zipmember, pwd=pwd).decode('utf-8'), dst_path, is_directory=True)
                 elif not os.path.isdir(dst_path):
                     os.makedirs(dst_path, exist_ok=True)
                     did_extract = True
             elif has_file_changed(zipmember, dst_path):  # only extract if file appears to be modified
                 base_dir = os.path.dirname(dst_path)
                 if not os.path.isdir(base_dir):
-                    os.makedirs(base_dir)
+                    os.makedirs(base_dir, exist_ok=True)
                 if is_symlink:
-                    did_extract = make_symlink(zipmember, dst_path, is_directory=False)
+                    # chmod follows the link, so it's created once its target has been extracted
+                    target = zip.read(zipmember, pwd=pwd).decode('utf-8')
+                    symlinks_to_create.append((zipmember, dst_path, target))
                 else:
-                    with zip.open(zipmember, pwd=pwd) as src, open(dst_path, "wb") as dst:
-                        shutil.copyfileobj(src, dst)
-                        did_extract = True
-                if did_extract:
-                    # set the correct permissions for files and folders
-                    perm = stat.S_IMODE(zipmember.external_attr >> 16)
-                    os.chmod(dst_path, perm)
-                    # always set the modification date from the zipmember timestamp,
-                    # this way we can avoid unnecessarily modifying files and causing full rebuilds
-                    time = get_zipinfo_datetime(zipmember)
-                    #print(f'    | {dst_path} {time}')
-                    mtime = time.timestamp()
-                    if System.windows:
-                        os.utime(dst_path, times=(mtime, mtime))
-                    else:
-                        os.utime(dst_path, times=(mtime, mtime), follow_symlinks=False)
+                    # regular files are decompressed in parallel below
+                    files_to_extract.append((zipmember, dst_path))
             if did_extract:
                 num_unzipped += 1
                 #print_debug(zipmember)
 
+    # zlib decompression releases the GIL, so large archives benefit from a thread pool
+    if len(files_to_extract) > 1:
+        if not max_workers:
+            max_workers = min(8, os.cpu_count() or 1)
+        # largest members first, so a big file doesn't start last and become the long tail
+        files_to_extract.sort(key=lambda f: f[0].compress_size, reverse=True)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as e:
+                futures = [e.submit(extract_file, m, dst) for m, dst in files_to_extract]
+                for f in futures:
+                    f.result()
+        finally:
+            for wzip in worker_zips:
+                wzip.close()
+    elif files_to_extract:
+        with zipfile.ZipFile(local_zip, "r") as zip:
+            local.zip = zip
+            extract_file(*files_to_extract[0])
+
+    num_unzipped += len(files_to_extract)
+
+    for zipmember, dst_path, target in symlinks_to_create:
+        if make_symlink(target, dst_path, is_directory=False):
+            set_file_attributes(zipmember, dst_path)
+            num_unzipped += 1
     return num_unzipped
 
 
@@ -349,6 +458,7 @@ def try_unzip(local_file:str, extract_dir:str) -> bool:
     If (success: True, num_extracted: 0) is returned, it means none of the destination files
     were different from the zip contents, and zero extractions were performed
     """
+    import zipfile
     try:
         files_extracted = unzip(local_file, extract_dir)
         return (True, files_extracted)
@@ -356,14 +466,14 @@ def try_unzip(local_file:str, extract_dir:str) -> bool:
         return (False, -1)
 
 
-def download_and_unzip(remote_file, extract_dir, local_file):
+def download_and_unzip(remote_file, extract_dir, local_file, max_workers=None):
     if local_file and os.path.exists(local_file):
         console(f"Skipping {os.path.basename(remote_file)} because {local_file} exists.")
         return extract_dir
     local_file = download_file(remote_file, extract_dir)
     if not local_file:
         return None
-    unzip(local_file, extract_dir)
+    unzip(local_file, extract_dir, max_workers=max_workers)
     console(f'Extracted {local_file} to {extract_dir}')
     return extract_dir
 
@@ -415,6 +525,7 @@ def copy_file(src: str, dst: str, filter: list = None) -> bool:
             dst = os.path.join(dst, os.path.basename(src))
         if _should_copy(src, dst):
             #console(f'copy {src}\n --> {dst}')
+            # copyfile uses the kernel fast-copy (sendfile/fcopyfile) where available
             shutil.copyfile(src, dst, follow_symlinks=True)
             shutil.copystat(src, dst, follow_symlinks=True)
             return True
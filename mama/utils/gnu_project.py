@@ -183,7 +183,7 @@ class GnuProject:
         build_root = self.target.build_dir()
         if self.git:
             console(f'>>> Cloning {source} from {self.git}', color='green')
-            if os.system(f'git clone {self.git} {source}') != 0:
+            if proc.execute(['git', 'clone', self.git, source], throw=False) != 0:
                 raise Exception(f'Failed to clone {self.git} to {source}')
         else:
             url = self.url.replace('{{project}}', self.name_with_version)
@@ -217,16 +217,19 @@ class GnuProject:
         if self.target.oclea:
             self.target.oclea.get_gnu_build_env(self.extra_env)
         else:
-            # GNU projects need to be configured with the CC, CXX and AR environment variables set
+            # GNU projects need to be configured with the CC, CXX and AR environment variables set,
+            # these only go to this project's commands, since other deps may be building concurrently
             cc_prefix = self.target.get_cc_prefix()
             if cc_prefix:
-                os.environ['CC'] = cc_prefix + 'gcc'
-                os.environ['CXX'] = cc_prefix + 'g++'
-                os.environ['AR'] = cc_prefix + 'ar'
-                os.environ['LD'] = cc_prefix + 'ld'
-                os.environ['READELF'] = cc_prefix + 'readelf'
-                os.environ['STRIP'] = cc_prefix + 'strip'
-                os.environ['RANLIB'] = cc_prefix + 'ranlib'
+                self.extra_env.update({
+                    'CC': cc_prefix + 'gcc',
+                    'CXX': cc_prefix + 'g++',
+                    'AR': cc_prefix + 'ar',
+                    'LD': cc_prefix + 'ld',
+                    'READELF': cc_prefix + 'readelf',
+                    'STRIP': cc_prefix + 'strip',
+                    'RANLIB': cc_prefix + 'ranlib',
+                })
 
 
 
@@ -272,12 +275,8 @@ class GnuProject:
 
 
     def _get_make_opts(self, opts, multithreaded=False):
-        jobs = f'-j {self.target.config.jobs}' if multithreaded else ''
-        all_opts = ''
-        for o in [self.make_opts, opts, jobs]:
-            if all_opts: all_opts += ' '
-            all_opts += o
-        return all_opts
+        jobs = f'-j {self.target.config.get_build_jobs()}' if multithreaded else ''
+        return ' '.join(o for o in (self.make_opts, opts, jobs) if o)
 
 
     def make(self, opts='', multithreaded=False):
@@ -336,8 +335,8 @@ class GnuProject:
     def strip(self, src_path, dest_path=None):
         prefix = self.target.get_cc_prefix()
         striptool = prefix + 'strip' if prefix else 'strip'
-        out = f'-o {dest_path}' if dest_path else ''
-        if os.system(f'{striptool} {src_path} {out}') != 0:
+        out = ['-o', dest_path] if dest_path else []
+        if proc.execute([striptool, src_path, *out], throw=False) != 0:
             raise Exception(f'Failed to strip {src_path}')
 
 
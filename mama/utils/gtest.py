@@ -12,13 +12,14 @@ def run_gtest(target: BuildTarget, executable: str, args='', src_dir=False, gdb=
     args, gdb = filter_gdb_arg(args, gdb)
     ## gtest flags:
     # https://github.com/google/googletest/blob/main/googletest/src/gtest.cc#L238
-    params = f' --gtest_output="xml:{target.source_dir("test/report.xml")}"'
+    params = [f'--gtest_output="xml:{target.source_dir("test/report.xml")}"']
     if args:
         for arg in args.split(' '):
             if arg.startswith('--gtest_'):
-                params += f' {arg}'
+                params.append(arg)
             else:
-                params += f' --gtest_filter="*{arg}*"'
+                params.append(f'--gtest_filter="*{arg}*"')
+    params = ' ' + ' '.join(params)
 
     if gdb:
         run_gdb(target, f'{executable} {params}', src_dir=src_dir)
@@ -1,12 +1,35 @@
-import os, shlex, shutil
+import os, sys, shlex, shutil, select, codecs
 from signal import SIGTERM
-from errno import ECHILD
+from errno import ECHILD, EIO
 import subprocess
 from time import sleep
 from .nonblocking_io import set_nonblocking
 from .system import System, console, error
 
 
+class EchoBuffer:
+    """
+    Collects echoed output lines and writes them with one write() per block of output,
+    instead of one write() per line. SubProcess.run() flushes it when the process goes quiet.
+    """
+    def __init__(self, max_lines=256):
+        self.lines = []
+        self.max_lines = max_lines
+
+    def echo(self, line: str):
+        self.lines.append(line)
+        if len(self.lines) >= self.max_lines:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.lines.append('') # for the trailing newline
+            text = '\n'.join(self.lines)
+            self.lines.clear()
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+
 class SubProcess:
     """
     An alternative to subprocess.Popen with redirectable IO
@@ -20,9 +43,13 @@ class SubProcess:
     def __init__(self, cmd, cwd, env=None, io_func=None):
         self.io_func = io_func
         self.status = None
+        self.output_closed = False # EOF or EIO on the output, nothing more can be read
+        # a read can end in the middle of a multi-byte character, the decoder keeps it for the next read
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
 
-        env = env if env else os.environ.copy()
-        args = shlex.split(cmd)
+        env = env if env else os.environ # execve and Popen only read it, no need to copy
+        # an argv list is used as-is, skipping any shell-style re-tokenizing
+        args = list(cmd) if isinstance(cmd, list) else shlex.split(cmd)
 
         executable = args[0]
         if os.path.isfile(executable): # it's something like `./run_tests` or `/usr/bin/gcc`
@@ -40,7 +67,8 @@ class SubProcess:
             try:
                 stdout = subprocess.PIPE if io_func else None
                 stderr = subprocess.STDOUT if io_func else None
-                self.process = subprocess.Popen(args, cwd=cwd, env=env, shell=True,
+                # executable is already resolved, so there's no need to spawn cmd.exe
+                self.process = subprocess.Popen(args, cwd=cwd, env=env, shell=False,
                                                 universal_newlines=True,
                                                 stdout=stdout,
                                                 stderr=stderr)
@@ -92,6 +120,8 @@ class SubProcess:
 
     def try_wait(self):
         """ Returns EXIT_STATUS int if process has finished, otherwise None """
+        if self.status is not None:
+            return self.status
         if System.windows:
             self.status = self.process.poll()
             return self.status
@@ -146,6 +176,8 @@ class SubProcess:
                 text = self.process.stdout.readline()
                 # console(f'line: {text} status={self.process.poll()}', end='')
                 got_bytes = len(text) > 0
+                if not got_bytes: # readline() blocks, so empty means EOF
+                    self.output_closed = True
                 if self.io_func and got_bytes:
                     self._parse_lines(text)
                 return got_bytes
@@ -153,15 +185,19 @@ class SubProcess:
                 if not self.parent_fd:
                     return False
 
-                data: bytes = os.read(self.parent_fd, 8192)
+                data: bytes = os.read(self.parent_fd, 65536)
                 got_bytes = len(data) > 0
+                if not got_bytes:
+                    self.output_closed = True
                 if self.io_func and got_bytes:
-                    text = data.decode()
-                    self._parse_lines(text)
+                    text = self.decoder.decode(data)
+                    if text: self._parse_lines(text)
                 return got_bytes
-        except OSError as _:
+        except OSError as e:
             # when in non-blocking IO, EAGAIN will be thrown if there's no data
-            # and when the other process closes the pipes
+            # and EIO when the other process closes the pty
+            if e.errno == EIO:
+                self.output_closed = True
             return False
 
 
@@ -174,6 +210,29 @@ class SubProcess:
                 break # we've read enough
         return num_reads > 0
 
+    def wait_for_output(self, timeout: float):
+        """
+        Blocks until there is output to read or `timeout` seconds have passed.
+        If there's no output to wait for, blocks until the process exits.
+        """
+        if self.output_closed or not self.io_func:
+            self._wait_for_exit() # select() would return instantly on a closed fd
+        elif System.windows:
+            sleep(0.01) # readline() already blocks
+        else:
+            select.select([self.parent_fd], [], [], timeout)
+
+    def _wait_for_exit(self):
+        if System.windows:
+            self.status = self.process.wait()
+        else:
+            try:
+                _, status = os.waitpid(self.pid, 0)
+                self.status = self._handle_exitstatus(status)
+            except OSError as e:
+                if e.errno == ECHILD:
+                    self.status = -1 # ECHILD: no such child
+
     def write(self, text: str):
         """ Writes the text to the process stdin """
         if System.windows:
@@ -183,14 +242,15 @@ class SubProcess:
             os.write(self.parent_fd, text.encode())
 
     @staticmethod
-    def run(cmd, cwd=None, env=None, io_func=None):
+    def run(cmd, cwd=None, env=None, io_func=None, echo_buffer:EchoBuffer=None):
         """
         Runs the titled sub-process with `cmd` using fork or forktty if io_func is set
-        - cmd: full command string
+        - cmd: full command string, or an argv list
         - cwd: working dir for the subprocess
         - env: execution environment, or None for default env
         - io_func: if set, this callback will receive SubProcess p reference and each line from output
                    if None, then output is echoed as normal to stdout/stderr
+        - echo_buffer: EchoBuffer that io_func echoes to, flushed whenever all available output was read
 
         ```
         SubProcess.run('tool', 'cmake xyz', env)
@@ -200,24 +260,33 @@ class SubProcess:
         p = SubProcess(cmd, cwd, env=env, io_func=io_func)
         try:
             while p.try_wait() is None:
-                p.read_outputs(max_blocks=1)
-                sleep(0.01)
+                # drain everything available, then sleep in select() until there's more
+                if not p.read_outputs():
+                    if echo_buffer: echo_buffer.flush()
+                    p.wait_for_output(0.1)
             p.read_outputs() # read any trailing output
         finally:
+            if echo_buffer: echo_buffer.flush()
             p.close()
         return p.status
 
 
-def execute(command, echo=False, throw=True):
+def execute(command, echo=False, throw=True, cwd=None):
     """ 
     Executes a command and returns the status code.
-    - command: command string
+    - command: command string, or an argv list which is run directly without a shell
     - echo: if True, prints the command to console
     - throw: if True, throws exception on status_code != 0
+    - cwd: working dir for argv list commands
     - returns: status code
     """
-    if echo: console(command)
-    retcode = os.system(command)
+    if isinstance(command, list):
+        if echo: console(' '.join(command))
+        retcode = subprocess.run(command, cwd=cwd).returncode
+        command = ' '.join(command)
+    else:
+        if echo: console(command)
+        retcode = os.system(command)
     if throw and retcode != 0:
         raise RuntimeError(f'{command} failed with return code {retcode}')
     return retcode
@@ -272,20 +341,20 @@ def execute_piped_echo(cwd, cmd, echo=True, env=None):
     """
     Wrapper around SubProcess.run(), returns status code with piped output (status, output).
     - cwd: working dir for the subprocess
-    - cmd: command string
+    - cmd: command string, or an argv list
     - echo: if True, also prints the output to console
     - env: overrrides the environment for the subprocess, default is os.environ
     - returns: (exit_status, output_string)
     """
     try:
         exit_status = -1
-        output = ''
+        lines = [] # joined once at the end, build logs can be huge
+        echo_buffer = EchoBuffer() if echo else None
         def handle_output(p:SubProcess, line:str):
-            nonlocal output
-            if echo: print(line)
-            output += line
-            output += '\n' # newline is not included
-        exit_status = SubProcess.run(cmd, cwd, env=env, io_func=handle_output)
-        return (exit_status, output)
+            if echo: echo_buffer.echo(line)
+            lines.append(line)
+            lines.append('\n') # newline is not included
+        exit_status = SubProcess.run(cmd, cwd, env=env, io_func=handle_output, echo_buffer=echo_buffer)
+        return (exit_status, ''.join(lines))
     except Exception as e:
-        return (-1, f'{output}{e}')
+        return (-1, f'{"".join(lines)}{e}')
@@ -1,4 +1,4 @@
-import sys, subprocess, platform
+import os, sys, subprocess, platform
 from termcolor import colored
 
 is_windows = sys.platform == 'win32'
@@ -48,3 +48,10 @@ def error(text:str):
     """ Prints a message as an error, usually colored red """
     console(text, color=Color.RED)
 
+
+def update_environ(env:dict):
+    """ Sets all `env` variables into os.environ, skipping the ones which already have the same value """
+    changed = { k: v for k, v in env.items() if os.environ.get(k) != v }
+    if changed:
+        os.environ.update(changed)
+
@@ -0,0 +1,41 @@
+import os
+from mama.platforms.android import Android
+from mama.cmake_configure import _platform_state
+
+
+class _AndroidConfig:
+    """ Minimal BuildConfig stand-in for an Android arm64 build """
+    def __init__(self):
+        self.arch = 'arm64'
+        self.print = False
+        self.android = Android(self)
+        self.oclea = None
+        self.mips = None
+        self.android.android_sdk_path = '/opt/android-sdk'
+        self.android.android_ndk_path = '/opt/android-sdk/ndk/25.0.0'
+
+    def is_target_arch_armv7(self):
+        return self.arch == 'arm'
+
+
+def test_platform_state_is_hashable_after_inject_env():
+    config = _AndroidConfig()
+    saved_env = dict(os.environ)
+    try:
+        config.android.inject_env() # caches the env dict on the Android object
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_env)
+    assert isinstance(config.android._env, dict)
+
+    state = _platform_state(config)
+    hash(state) # used in the _shared_default_options signature key
+    assert ('android_api', 'android-29') in state
+    assert not any(k.startswith('_') for k, _ in state)
+
+
+def test_platform_state_tracks_setting_changes():
+    config = _AndroidConfig()
+    before = _platform_state(config)
+    config.android.android_ndk_stl = 'c++_static'
+    assert _platform_state(config) != before